@@ -2,7 +2,13 @@ import streamlit as st
 import pandas as pd
 import joblib
 import numpy as np
+import os
+import time
 from utils import TextCleaner
+from audit import AuditLogger, model_version
+from similarity import PatientIndex
+from uncertainty import BootstrapEnsemble
+from schema import SCHEMA, SchemaError, validate_input
 
 # Configuration de la page
 st.set_page_config(
@@ -123,21 +129,66 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
+def training_medians(model):
+    """Médianes d'imputation apprises par le pipeline, par variable numérique"""
+    pipeline = getattr(model, 'pipeline', model)
+    preprocessor = pipeline.named_steps['preprocessor']
+    imputer = preprocessor.named_transformers_['num'].named_steps['imputer']
+    columns = next(cols for name, _, cols in preprocessor.transformers_ if name == 'num')
+    return dict(zip(columns, imputer.statistics_))
+
 # Charger le modèle
 @st.cache_resource
 def load_model():
     try:
         model = joblib.load('Model.pkl')
-        return model
     except FileNotFoundError:
         st.error("❌ Fichier Model.pkl introuvable. Veuillez d'abord exécuter main.py")
         st.stop()
     except Exception as e:
         st.error(f"❌ Erreur lors du chargement du modèle: {str(e)}")
         st.stop()
+    # Un modèle entraîné avant le décodage du schéma attend les valeurs brutes de CHD.csv
+    out_of_range = [name for name, median in training_medians(model).items()
+                    if not SCHEMA[name].min_value <= median <= SCHEMA[name].max_value]
+    if out_of_range:
+        st.error(f"❌ Model.pkl a été entraîné sur des valeurs non décodées ({', '.join(out_of_range)}). "
+                 "Veuillez relancer main.py")
+        st.stop()
+    return model
+
+# Index des patients similaires (optionnel, produit par main.py)
+@st.cache_resource
+def load_patient_index():
+    try:
+        return joblib.load('Neighbors.pkl')
+    except FileNotFoundError:
+        return None
+
+# Ensemble bootstrap pour l'intervalle de confiance (optionnel, produit par main.py)
+@st.cache_resource
+def load_ensemble():
+    try:
+        return joblib.load('Ensemble.pkl')
+    except FileNotFoundError:
+        return None
+
+# Journal d'audit (écritures tamponnées dans un thread de fond);
+# CHD_AUDIT_DIR le redirige, par exemple pour les tests de charge
+@st.cache_resource
+def get_audit_logger():
+    return AuditLogger(directory=os.environ.get('CHD_AUDIT_DIR', 'audit'))
+
+@st.cache_resource
+def get_model_version():
+    return model_version('Model.pkl')
 
 try:
     model = load_model()
+    patient_index = load_patient_index()
+    ensemble = load_ensemble()
+    audit_logger = get_audit_logger()
+    current_model_version = get_model_version()
 except Exception as e:
     st.error(f"Erreur: {str(e)}")
     st.stop()
@@ -181,24 +232,25 @@ with col1:
     
     sbp = st.number_input(
         "🫀 Pression Artérielle Systolique (mmHg)",
-        min_value=80,
-        max_value=250,
+        min_value=int(SCHEMA['sbp'].min_value),
+        max_value=int(SCHEMA['sbp'].max_value),
         value=120,
         help="💡 Valeur normale: 90-120 mmHg"
     )
     
     ldl = st.number_input(
-        "🧪 Cholestérol LDL (mg/dL)",
-        min_value=0,
-        max_value=1000,
-        value=150,
-        help="💡 Valeur optimale: < 100 mg/dL"
+        "🧪 Cholestérol LDL (mmol/L)",
+        min_value=SCHEMA['ldl'].min_value,
+        max_value=SCHEMA['ldl'].max_value,
+        value=4.5,
+        step=0.01,
+        help="💡 Valeur optimale: < 2.6 mmol/L"
     )
     
     adiposity = st.number_input(
         "📊 Indice d'Adiposité",
-        min_value=0.0,
-        max_value=50.0,
+        min_value=SCHEMA['adiposity'].min_value,
+        max_value=SCHEMA['adiposity'].max_value,
         value=25.0,
         step=0.1,
         help="💡 Indicateur de composition corporelle"
@@ -209,16 +261,17 @@ with col2:
     
     obesity = st.number_input(
         "⚖️ Indice de Masse Corporelle (BMI)",
-        min_value=10,
-        max_value=50,
-        value=25,
+        min_value=SCHEMA['obesity'].min_value,
+        max_value=SCHEMA['obesity'].max_value,
+        value=25.0,
+        step=0.1,
         help="💡 Normal: 18.5-24.9 | Surpoids: 25-29.9 | Obésité: ≥30"
     )
     
     age = st.number_input(
         "📅 Âge (années)",
-        min_value=15,
-        max_value=100,
+        min_value=int(SCHEMA['age'].min_value),
+        max_value=int(SCHEMA['age'].max_value),
         value=45,
         help="💡 Facteur de risque cardiovasculaire"
     )
@@ -251,8 +304,32 @@ if predict_button:
         
         # Prédiction
         try:
+            # Valeurs telles que saisies (journal d'audit), avant le typage float32
+            entered = input_data.iloc[0].to_dict()
+            # Validation et typage selon le schéma partagé avec main.py
+            input_data = validate_input(input_data)
+            start = time.perf_counter()
             prediction = model.predict(input_data)[0]
             probability = model.predict_proba(input_data)[0]
+            duration_ms = (time.perf_counter() - start) * 1000
+            if ensemble is not None:
+                low, high = ensemble.predict_interval(input_data, alpha=0.1)
+                risk_caption = f"IC 90%: {low[0] * 100:.1f}% – {high[0] * 100:.1f}%"
+            else:
+                risk_caption = "Score de risque"
+            similar_patients = patient_index.query(input_data, k=5) if patient_index is not None else None
+            
+            # Enregistrement d'audit (attente brève si la file est pleine)
+            if not audit_logger.log(
+                entered,
+                probability,
+                prediction,
+                current_model_version,
+                duration_ms
+            ):
+                dropped = audit_logger.metrics()['dropped']
+                st.warning(f"⚠️ Journal d'audit saturé: cette évaluation n'a pas été enregistrée "
+                           f"({dropped} rejet(s) depuis le démarrage)")
             
             st.markdown("<hr>", unsafe_allow_html=True)
             
@@ -293,9 +370,9 @@ if predict_button:
                         <p style='color: white; font-size: 3rem; font-weight: 900; margin: 10px 0;'>
                             {:.1f}%
                         </p>
-                        <p style='color: white; font-size: 1rem; margin: 0;'>Score de risque</p>
+                        <p style='color: white; font-size: 1rem; margin: 0;'>{}</p>
                     </div>
-                """.format(probability[1] * 100), unsafe_allow_html=True)
+                """.format(probability[1] * 100, risk_caption), unsafe_allow_html=True)
             
             with col3:
                 st.markdown("""
@@ -438,6 +515,16 @@ if predict_button:
             with st.expander("📋 Détail des Paramètres Analysés"):
                 st.dataframe(input_data, use_container_width=True)
             
+            # Patients similaires de la cohorte d'entraînement
+            if similar_patients is not None:
+                with st.expander("👥 Patients Similaires de la Cohorte"):
+                    n_chd = int(similar_patients['chd'].sum())
+                    st.markdown(f"**{n_chd} patient(s) sur {len(similar_patients)}** parmi les profils "
+                                "les plus proches ont développé une maladie cardiaque.")
+                    st.dataframe(similar_patients, use_container_width=True)
+            
+        except SchemaError as e:
+            st.error(f"❌ Paramètres invalides: {str(e)}")
         except Exception as e:
             st.error(f"❌ Erreur lors de l'analyse: {str(e)}")
 
@@ -520,7 +607,7 @@ with st.expander("📚 Guide des Paramètres Analysés"):
         
         <p><b>🧪 Cholestérol LDL</b></p>
         <p>Le LDL (Low-Density Lipoprotein) est le "mauvais cholestérol" qui s'accumule dans 
-        les artères. Un niveau optimal est inférieur à 100 mg/dL. Des niveaux élevés 
+        les artères. Un niveau optimal est inférieur à 2.6 mmol/L (100 mg/dL). Des niveaux élevés 
         favorisent l'athérosclérose et augmentent le risque de maladie cardiaque.</p>
         
         <p><b>⚖️ Indice de Masse Corporelle (BMI)</b></p>
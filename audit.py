@@ -0,0 +1,213 @@
+import atexit
+import datetime
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import weakref
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Journaux ouverts dans le processus (les instances mises en cache par app.py incluses)
+_open_loggers = weakref.WeakSet()
+
+
+def model_version(path='Model.pkl'):
+    """Empreinte courte (sha256) du fichier modèle, utilisée comme version"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def _to_builtin(value):
+    """Convertit les types numpy/pandas en types JSON natifs"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+
+class AuditLogger:
+    """Journal d'audit des prédictions, en ajout seul.
+
+    Les enregistrements sont placés dans une file bornée puis écrits par lots
+    dans un fichier JSONL par un thread de fond : l'appel à ``log`` ne fait
+    jamais d'entrée/sortie disque. Au-delà de ``max_bytes``, le fichier est
+    clos sous un nom horodaté (predictions.20261018T225626123456Z.jsonl) et
+    aucun segment n'est jamais supprimé. Si la file reste pleine plus de
+    ``block_timeout`` secondes, l'enregistrement est rejeté, compté dans
+    ``metrics()['dropped']`` et signalé par un avertissement. Une écriture
+    en échec est retentée ``write_retries`` fois (attente doublée à chaque
+    essai) avant que le lot ne soit compté et signalé de la même façon.
+    """
+
+    def __init__(self, directory='audit', filename='predictions.jsonl',
+                 max_queue=10000, batch_size=256, flush_interval=1.0,
+                 max_bytes=50 * 1024 * 1024, block_timeout=0.25, write_retries=4, retry_delay=0.1):
+        self.directory = directory
+        self.path = os.path.join(directory, filename)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.block_timeout = block_timeout
+        self.write_retries = write_retries
+        self.retry_delay = retry_delay
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._metrics = {
+            'enqueued': 0,
+            'written': 0,
+            'dropped': 0,
+            'blocked_seconds': 0.0,
+            'queue_high_water': 0,
+            'batches': 0,
+            'bytes_written': 0,
+            'rotations': 0,
+            'write_errors': 0,
+            'last_flush_ms': 0.0,
+        }
+
+        os.makedirs(directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+        _open_loggers.add(self)
+
+    def log(self, input_row, probabilities, prediction, model_version, duration_ms):
+        """Ajoute une évaluation à la file. Retourne False si elle a été rejetée (file pleine)"""
+        record = {
+            'ts': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'model_version': model_version,
+            'input': dict(input_row),
+            'prediction': prediction,
+            'probabilities': list(probabilities),
+            'duration_ms': duration_ms,
+        }
+        start = time.perf_counter()
+        try:
+            if self.block_timeout > 0:
+                self._queue.put(record, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self._metrics['dropped'] += 1
+                self._metrics['blocked_seconds'] += time.perf_counter() - start
+                dropped = self._metrics['dropped']
+            logger.warning("Journal d'audit saturé: %d enregistrement(s) rejeté(s) au total", dropped)
+            return False
+
+        size = self._queue.qsize()
+        with self._lock:
+            self._metrics['enqueued'] += 1
+            self._metrics['blocked_seconds'] += time.perf_counter() - start
+            if size > self._metrics['queue_high_water']:
+                self._metrics['queue_high_water'] = size
+        return True
+
+    def metrics(self):
+        """Compteurs de débit et de contre-pression"""
+        with self._lock:
+            stats = dict(self._metrics)
+        stats['queue_size'] = self._queue.qsize()
+        stats['queue_capacity'] = self._queue.maxsize
+        return stats
+
+    def flush(self, timeout=5.0):
+        """Attend que tous les enregistrements en file soient écrits"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return self._queue.unfinished_tasks == 0
+
+    def close(self, timeout=5.0):
+        """Vide la file puis arrête le thread d'écriture"""
+        if self._stop.is_set():
+            return
+        self.flush(timeout)
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = [first]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._write(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _write(self, batch):
+        start = time.perf_counter()
+        payload = ''.join(
+            json.dumps(record, default=_to_builtin, ensure_ascii=False) + '\n'
+            for record in batch
+        ).encode('utf-8')
+        for attempt in range(self.write_retries + 1):
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                self._rotate_if_needed(len(payload))
+                with open(self.path, 'ab') as f:
+                    f.write(payload)
+                break
+            except OSError as error:
+                with self._lock:
+                    self._metrics['write_errors'] += 1
+                if attempt == self.write_retries:
+                    # Le lot est perdu: compté et signalé comme un rejet de file pleine
+                    with self._lock:
+                        self._metrics['dropped'] += len(batch)
+                        dropped = self._metrics['dropped']
+                    logger.warning("Écriture du journal d'audit impossible (%s): %d enregistrement(s) "
+                                   "perdu(s), %d rejeté(s) au total", error, len(batch), dropped)
+                    return
+                time.sleep(self.retry_delay * 2 ** attempt)
+        with self._lock:
+            self._metrics['written'] += len(batch)
+            self._metrics['batches'] += 1
+            self._metrics['bytes_written'] += len(payload)
+            self._metrics['last_flush_ms'] = (time.perf_counter() - start) * 1000
+
+    def _segment_path(self):
+        stem, ext = os.path.splitext(self.path)
+        stamp = datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+        candidate, n = f"{stem}.{stamp}{ext}", 1
+        while os.path.exists(candidate):
+            candidate, n = f"{stem}.{stamp}-{n}{ext}", n + 1
+        return candidate
+
+    def _rotate_if_needed(self, incoming):
+        """Clôt le fichier courant sous un nom horodaté; les segments ne sont jamais supprimés"""
+        try:
+            current = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return
+        if current == 0 or current + incoming <= self.max_bytes:
+            return
+        os.rename(self.path, self._segment_path())
+        with self._lock:
+            self._metrics['rotations'] += 1
+
+
+def close_all(directory=None):
+    """Vide et ferme les journaux ouverts, ou seulement ceux de ``directory``"""
+    for audit_logger in list(_open_loggers):
+        if directory is None or os.path.abspath(audit_logger.directory) == os.path.abspath(directory):
+            audit_logger.close()
@@ -0,0 +1,80 @@
+"""Graphiques de diagnostic de main.py, optionnels et à import paresseux.
+
+matplotlib n'est importé qu'au moment de tracer: un réentraînement lancé
+avec ``python main.py --no-plots`` ne charge aucune bibliothèque graphique.
+Les valeurs manquantes sont tracées à partir de comptages agrégés (par
+colonne et par bloc de lignes) plutôt que du tableau booléen complet.
+"""
+import numpy as np
+import pandas as pd
+
+
+def missing_counts(df, n_blocks=50):
+    """Valeurs manquantes par colonne et fraction manquante par bloc de lignes.
+
+    Retourne (Series des comptes par colonne, DataFrame blocs x colonnes).
+    Chaque colonne est réduite séparément: aucun masque n x p n'est construit.
+    """
+    n_rows = len(df)
+    n_blocks = max(1, min(n_blocks, n_rows))
+    starts = np.linspace(0, n_rows, n_blocks + 1).astype(int)[:-1]
+    sizes = np.diff(np.append(starts, n_rows))
+
+    per_block = {}
+    for column in df.columns:
+        missing = df[column].isna().to_numpy().astype(np.int64)
+        per_block[column] = np.add.reduceat(missing, starts) if n_rows else np.zeros(1, dtype=np.int64)
+    block_counts = pd.DataFrame(per_block, index=starts)
+    counts = block_counts.sum()
+    blocks = block_counts.div(np.maximum(sizes, 1), axis=0)
+    return counts, blocks
+
+
+def _pyplot():
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def plot_missing_values(counts, blocks, path='missing_values.png'):
+    """Comptes par colonne et carte des fractions manquantes par bloc de lignes"""
+    plt = _pyplot()
+    fig, (ax_counts, ax_blocks) = plt.subplots(
+        1, 2, figsize=(12, 6), gridspec_kw={'width_ratios': [1, 2]}
+    )
+    ax_counts.barh(counts.index, counts.values, color='#3b82f6')
+    ax_counts.invert_yaxis()
+    ax_counts.set_xlabel('Valeurs manquantes')
+    ax_counts.set_title('Par colonne')
+
+    image = ax_blocks.imshow(blocks.to_numpy(), aspect='auto', cmap='viridis',
+                             vmin=0, vmax=max(blocks.to_numpy().max(), 1e-9))
+    ax_blocks.set_xticks(range(len(blocks.columns)))
+    ax_blocks.set_xticklabels(blocks.columns, rotation=45, ha='right')
+    ax_blocks.set_ylabel('Bloc de lignes')
+    ax_blocks.set_title('Fraction manquante par bloc de lignes')
+    fig.colorbar(image, ax=ax_blocks)
+
+    fig.suptitle('Valeurs manquantes dans le dataset')
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+    return path
+
+
+def plot_pca_variance(cumulative_variance, path='pca_variance.png', threshold=0.90):
+    """Variance cumulative d'une ACP déjà ajustée"""
+    plt = _pyplot()
+    fig = plt.figure(figsize=(10, 6))
+    plt.plot(range(1, len(cumulative_variance) + 1), cumulative_variance, 'bo-')
+    plt.axhline(y=threshold, color='r', linestyle='--', label=f'{threshold:.0%} de variance')
+    plt.xlabel('Nombre de composantes')
+    plt.ylabel('Variance expliquée cumulative')
+    plt.title('Variance expliquée par l\'ACP')
+    plt.legend()
+    plt.grid(True)
+    plt.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+    return path
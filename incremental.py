@@ -0,0 +1,291 @@
+"""Rafraîchissement incrémental du pipeline KNN (SMOTE + ACP + KNN).
+
+Au lieu de relancer main.py, les nouveaux patients étiquetés sont ajoutés à
+l'index de voisins existant avec des échantillons synthétiques générés
+localement, et ``n_neighbors`` est réévalué à partir des listes de voisins
+mises en cache.
+
+L'état n'est utilisable qu'avec le Model.pkl dont il est issu (empreinte
+``model_version`` comparée). Après une mise à jour, Ensemble.pkl et
+Neighbors.pkl décrivent l'ancien modèle et l'ancienne cohorte: ils sont
+supprimés et app.py fonctionne sans eux jusqu'au prochain main.py.
+
+Usage:
+    python incremental.py nouveaux_patients.csv [--refit-pca]
+"""
+import argparse
+import os
+
+import joblib
+import numpy as np
+from sklearn.base import clone
+from sklearn.metrics.pairwise import euclidean_distances
+from sklearn.neighbors import NearestNeighbors
+from sklearn.pipeline import Pipeline
+from utils import TextCleaner, CalibratedModel
+from audit import model_version
+from schema import read_chd
+
+
+def _segment_parents(X_class, neighbors, S, n_seeds=8, chunk_size=4096):
+    """Pour chaque point synthétique, le segment SMOTE (graine, voisin) qui le contient.
+
+    Les graines candidates sont les ``n_seeds`` points réels les plus proches;
+    le nombre de candidats est multiplié par 4 pour les points non résolus,
+    jusqu'à la classe entière.
+    """
+    finder = NearestNeighbors().fit(X_class)
+    k = neighbors.shape[1]
+    parents = np.zeros((len(S), 2), dtype=np.int64)
+    todo = np.arange(len(S))
+    m = n_seeds
+    while len(todo):
+        m = min(m, len(X_class))
+        unresolved = []
+        for begin in range(0, len(todo), chunk_size):
+            rows = todo[begin:begin + chunk_size]
+            points = S[rows]
+            seeds = finder.kneighbors(points, n_neighbors=m, return_distance=False)
+            A = X_class[seeds][:, :, None, :]
+            D = X_class[neighbors[seeds]] - A
+            P = points[:, None, None, :] - A
+            length = (D * D).sum(axis=-1)
+            t = np.clip(np.divide((P * D).sum(axis=-1), length, out=np.zeros_like(length), where=length > 0), 0, 1)
+            residual = ((P - t[..., None] * D) ** 2).sum(axis=-1).reshape(len(rows), -1)
+            best = residual.argmin(axis=1)
+            seed = seeds[np.arange(len(rows)), best // k]
+            parents[rows] = np.column_stack([seed, neighbors[seed, best % k]])
+            exact = residual[np.arange(len(rows)), best] <= 1e-12 * (1 + (points ** 2).sum(axis=1))
+            unresolved.append(rows[~exact])
+        todo = np.concatenate(unresolved)
+        if m == len(X_class):
+            break
+        m *= 4
+    return parents
+
+
+def _resample(smote, Z, y):
+    """SMOTE identique à ``smote`` (mêmes paramètres); parents = -1 pour les points réels"""
+    fitted = clone(smote)
+    Z_res, y_res = fitted.fit_resample(Z, y)
+    Z_res, y_res = np.asarray(Z_res, dtype=float), np.asarray(y_res)
+    parents = np.full((len(y_res), 2), -1, dtype=np.int64)
+    if len(y_res) > len(y):
+        # Cas binaire: nn_k_ est ajusté sur la seule classe suréchantillonnée
+        members = np.flatnonzero(np.asarray(y) == y_res[len(y)])
+        X_class = np.asarray(Z, dtype=float)[members]
+        neighbors = fitted.nn_k_.kneighbors(X_class, return_distance=False)[:, 1:]
+        parents[len(y):] = members[_segment_parents(X_class, neighbors, Z_res[len(y):])]
+    return Z_res, y_res, parents
+
+
+class KNNRefresher:
+    """État du pipeline KNN permettant des mises à jour sans réentraînement complet.
+
+    Les échantillons (réels et synthétiques) sont conservés avant ACP pour
+    pouvoir projeter les nouveaux points ou réajuster la base. Le score de
+    chaque ``n_neighbors`` est une accuracy leave-one-out sur les patients
+    réels, calculée à partir de leurs ``max(k_grid)`` plus proches voisins;
+    les échantillons synthétiques interpolés à partir du patient évalué sont
+    exclus de ses voisins, comme ils le seraient d'un pli de validation.
+    """
+
+    def __init__(self, pipeline, X, y, k_grid=(3, 5, 7, 9, 11, 15, 20), random_state=123):
+        self.pipeline = pipeline
+        self.k_grid = sorted(k_grid)
+        self.max_k = self.k_grid[-1]
+        self.rng = np.random.RandomState(random_state)
+
+        names = [name for name, _ in pipeline.steps]
+        smote_index = names.index('smote')
+        self.preprocess = Pipeline(pipeline.steps[:smote_index])
+        self.smote = pipeline.named_steps['smote']
+        self.pca = pipeline.named_steps.get('pca')
+        self.classifier = pipeline.named_steps['classifier']
+
+        # Même SMOTE (même random_state) que lors de l'entraînement du pipeline
+        Z = self.preprocess.transform(X)
+        y = np.asarray(y)
+        self.X_all, self.y_all, self.parents = _resample(self.smote, Z, y)
+        self.is_real = np.zeros(len(self.y_all), dtype=bool)
+        self.is_real[:len(y)] = True
+
+        self._rebuild()
+
+    def _project(self, Z):
+        return self.pca.transform(Z) if self.pca is not None else Z
+
+    def _rebuild(self):
+        """Projette tous les points, reconstruit l'index et les listes de voisins"""
+        self.P_all = self._project(self.X_all)
+        self.classifier.fit(self.P_all, self.y_all)
+        real = np.flatnonzero(self.is_real)
+        self.neighbor_dist, self.neighbor_idx = self._query(self.P_all[real], real)
+
+    def _derived(self, idx, own):
+        """Voisins qui sont le point lui-même ou un échantillon synthétique issu de lui"""
+        parents = self.parents[idx]
+        return (idx == own[:, None]) | (parents == own[:, None, None]).any(axis=-1)
+
+    def _query(self, P, own):
+        """k plus proches voisins dans l'index, hors du point et de ses dérivés synthétiques"""
+        children = np.bincount(self.parents[self.parents >= 0].ravel(), minlength=len(self.y_all))
+        extra = int(children[own].max()) if len(own) else 0
+        n_query = min(self.max_k + 1 + extra, len(self.P_all))
+        dist, idx = self.classifier.kneighbors(P, n_neighbors=n_query)
+        key = np.where(self._derived(idx, own), np.inf, dist)
+        order = np.argsort(key, axis=1, kind='stable')[:, :self.max_k]
+        return np.take_along_axis(dist, order, axis=1), np.take_along_axis(idx, order, axis=1)
+
+    def _synthesize(self, n_samples, minority, new_real):
+        """Interpolation SMOTE autour des nouveaux patients minoritaires (à défaut, de tous)"""
+        pool = np.flatnonzero(self.is_real & (self.y_all == minority))
+        seeds = np.intersect1d(new_real, pool)
+        if len(seeds) == 0:
+            seeds = pool
+        k = min(self.smote.k_neighbors, len(pool) - 1)
+        nn = NearestNeighbors(n_neighbors=k + 1).fit(self.X_all[pool])
+        chosen = self.rng.choice(seeds, size=n_samples)
+        _, neigh = nn.kneighbors(self.X_all[chosen])
+        partner = pool[neigh[np.arange(n_samples), self.rng.randint(1, k + 1, size=n_samples)]]
+        gap = self.rng.uniform(size=(n_samples, 1))
+        base = self.X_all[chosen]
+        return base + gap * (self.X_all[partner] - base), np.column_stack([chosen, partner])
+
+    def update(self, X_new, y_new, refit_pca=False):
+        """Ajoute de nouveaux patients étiquetés et réévalue n_neighbors"""
+        Z_new = np.asarray(self.preprocess.transform(X_new), dtype=float)
+        y_new = np.asarray(y_new)
+
+        real_y = self.y_all[self.is_real]
+        classes, counts = np.unique(np.concatenate([real_y, y_new]), return_counts=True)
+        minority = classes[np.argmin(counts)]
+        synthetic = ~self.is_real
+        if np.any(self.y_all[synthetic] != minority):
+            # La classe minoritaire a changé: SMOTE complet sur les données réelles
+            real_X = np.vstack([self.X_all[self.is_real], Z_new])
+            self.X_all, self.y_all, self.parents = _resample(
+                self.smote, real_X, np.concatenate([real_y, y_new])
+            )
+            self.is_real = np.zeros(len(self.y_all), dtype=bool)
+            self.is_real[:len(real_X)] = True
+            if refit_pca and self.pca is not None:
+                self.pca.fit(self.X_all)
+            self._rebuild()
+            return self.rescore()
+
+        start = len(self.y_all)
+        self.X_all = np.vstack([self.X_all, Z_new])
+        self.y_all = np.concatenate([self.y_all, y_new])
+        self.is_real = np.concatenate([self.is_real, np.ones(len(y_new), dtype=bool)])
+        self.parents = np.vstack([self.parents, np.full((len(y_new), 2), -1, dtype=np.int64)])
+        new_real = np.arange(start, len(self.y_all))
+
+        missing = (counts.max() - counts.min()) - synthetic.sum()
+        dropped = False
+        if missing > 0:
+            X_syn, parents = self._synthesize(missing, minority, new_real)
+            self.X_all = np.vstack([self.X_all, X_syn])
+            self.parents = np.vstack([self.parents, parents])
+            self.y_all = np.concatenate([self.y_all, np.full(missing, minority)])
+            self.is_real = np.concatenate([self.is_real, np.zeros(missing, dtype=bool)])
+        elif missing < 0:
+            # Trop d'échantillons synthétiques: on retire les plus récents
+            drop = np.flatnonzero(~self.is_real)[missing:]
+            keep = np.ones(len(self.y_all), dtype=bool)
+            keep[drop] = False
+            self.X_all, self.y_all, self.is_real = self.X_all[keep], self.y_all[keep], self.is_real[keep]
+            # Les parents sont des points réels, toujours conservés: renumérotation
+            position = np.cumsum(keep) - 1
+            self.parents = self.parents[keep]
+            self.parents = np.where(self.parents >= 0, position[self.parents], -1)
+            dropped = True
+
+        if (refit_pca and self.pca is not None) or dropped:
+            # Nouvelle base ou indices décalés: l'index et les listes sont recalculés
+            if refit_pca and self.pca is not None:
+                self.pca.fit(self.X_all)
+            self._rebuild()
+            return self.rescore()
+
+        # Base ACP fixe: seuls les nouveaux points sont projetés
+        P_added = self._project(self.X_all[start:])
+        self.P_all = np.vstack([self.P_all[:start], P_added])
+        self.classifier.fit(self.P_all, self.y_all)
+
+        # Fusion des listes en cache avec les distances aux seuls points ajoutés
+        old_real = np.flatnonzero(self.is_real[:start])
+        added = np.arange(start, len(self.y_all))
+        d_added = euclidean_distances(self.P_all[old_real], P_added)
+        d_added[self._derived(np.broadcast_to(added, d_added.shape), old_real)] = np.inf
+        dist = np.hstack([self.neighbor_dist, d_added])
+        idx = np.hstack([self.neighbor_idx, np.broadcast_to(added, d_added.shape)])
+        order = np.argsort(dist, axis=1, kind='stable')[:, :self.max_k]
+        old_dist = np.take_along_axis(dist, order, axis=1)
+        old_idx = np.take_along_axis(idx, order, axis=1)
+
+        new_dist, new_idx = self._query(self.P_all[new_real], new_real)
+        self.neighbor_dist = np.vstack([old_dist, new_dist])
+        self.neighbor_idx = np.vstack([old_idx, new_idx])
+        return self.rescore()
+
+    def rescore(self):
+        """Accuracy leave-one-out par n_neighbors; applique le meilleur au classifieur"""
+        real_y = self.y_all[self.is_real]
+        classes = self.classifier.classes_
+        votes = (self.y_all[self.neighbor_idx] == classes[1]).cumsum(axis=1)
+        scores = {}
+        for k in self.k_grid:
+            # Comme KNeighborsClassifier, une égalité des votes revient à la première classe
+            predicted = np.where(votes[:, k - 1] * 2 > k, classes[1], classes[0])
+            scores[k] = float((predicted == real_y).mean())
+        best_k = max(scores, key=scores.get)
+        self.classifier.set_params(n_neighbors=best_k)
+        self.scores_ = scores
+        self.best_k_ = best_k
+        return scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ajout incrémental de patients au modèle KNN")
+    parser.add_argument('data', help="CSV (séparateur ';') contenant les colonnes du dataset et 'chd'")
+    parser.add_argument('--state', default='KNN_state.pkl')
+    parser.add_argument('--model', default='Model.pkl')
+    parser.add_argument('--refit-pca', action='store_true', help="Réajuste la base de l'ACP")
+    parser.add_argument('--derived', nargs='*', default=['Ensemble.pkl', 'Neighbors.pkl'],
+                        help="Artefacts invalidés par la mise à jour")
+    args = parser.parse_args()
+
+    refresher = joblib.load(args.state)
+    current = model_version(args.model)
+    if getattr(refresher, 'model_version', None) != current:
+        raise SystemExit(f"❌ {args.state} ne correspond pas à {args.model} (version {current}). "
+                         "Relancez main.py: l'état KNN n'existe que si KNN est le meilleur modèle.")
+    df, _ = read_chd(args.data)
+    scores = refresher.update(df.drop('chd', axis=1), df['chd'], refit_pca=args.refit_pca)
+
+    print("\nAccuracy leave-one-out par n_neighbors:")
+    for k, score in scores.items():
+        print(f"  n_neighbors={k}: {score:.4f}")
+    print(f"\nMeilleur n_neighbors: {refresher.best_k_}")
+
+    # La table de calibration de Model.pkl est conservée telle quelle
+    model = joblib.load(args.model)
+    if isinstance(model, CalibratedModel):
+        model.pipeline = refresher.pipeline
+    else:
+        model = refresher.pipeline
+
+    joblib.dump(model, args.model)
+    refresher.model_version = model_version(args.model)
+    joblib.dump(refresher, args.state)
+    print(f"\n✅ Modèle mis à jour: {args.model} (état: {args.state})")
+
+    for path in args.derived:
+        if os.path.exists(path):
+            os.remove(path)
+            print(f"  {path} supprimé (décrivait l'ancien modèle); relancer main.py pour le régénérer")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+"""Mode d'inférence float32 pour le scoring par lots.
+
+Le pipeline entraîné par main.py est « compilé » en une suite d'opérations
+numpy float32 (imputation, standardisation, ACP, classifieur) qui évitent
+les DataFrames intermédiaires et les copies en float64.
+
+Usage:
+    python inference.py --model Model.pkl --data CHD.csv --rows 1000000
+"""
+import argparse
+import time
+import tracemalloc
+
+import joblib
+import numpy as np
+import pandas as pd
+from utils import TextCleaner, CalibratedModel
+from schema import read_chd
+
+
+class Float32Scorer:
+    """Reproduction float32 d'un pipeline TextCleaner -> ColumnTransformer -> [ACP] -> classifieur"""
+
+    def __init__(self, model, dtype=np.float32, chunk_size=512):
+        self.dtype = np.dtype(dtype)
+        self.chunk_size = chunk_size
+        self.pca_components = None
+        self.pca_mean = None
+        self.knn = None
+        self.calibration = None
+
+        if isinstance(model, CalibratedModel):
+            self.calibration = (model.thresholds.astype(self.dtype), model.values.astype(self.dtype))
+            model = model.pipeline
+
+        for name, step in model.steps:
+            if name == 'cleaner' or hasattr(step, 'fit_resample'):
+                # Le nettoyage est intégré à l'encodage; SMOTE n'intervient qu'à l'entraînement
+                continue
+            if hasattr(step, 'transformers_'):
+                self._compile_preprocessor(step)
+            elif hasattr(step, 'components_'):
+                if getattr(step, 'whiten', False):
+                    raise ValueError("ACP avec whiten=True non supportée")
+                self.pca_components = step.components_.T.astype(self.dtype)
+                self.pca_mean = step.mean_.astype(self.dtype)
+            elif hasattr(step, 'coef_'):
+                if step.coef_.shape[0] != 1:
+                    raise ValueError("Seule la régression logistique binaire est supportée")
+                self.classes_ = step.classes_
+                self.coef = step.coef_.ravel().astype(self.dtype)
+                self.intercept = self.dtype.type(step.intercept_[0])
+            elif hasattr(step, '_fit_X'):
+                self._compile_knn(step)
+            else:
+                raise ValueError(f"Étape non supportée: {name} ({type(step).__name__})")
+
+    def _compile_preprocessor(self, preprocessor):
+        self.numeric_features = []
+        self.categorical_feature = None
+        for name, pipe, columns in preprocessor.transformers_:
+            if name == 'remainder':
+                continue
+            steps = dict(pipe.steps)
+            if 'scaler' in steps:
+                self.numeric_features = list(columns)
+                self.medians = steps['imputer'].statistics_.astype(self.dtype)
+                self.scale_mean = steps['scaler'].mean_.astype(self.dtype)
+                self.scale = steps['scaler'].scale_.astype(self.dtype)
+            elif 'onehot' in steps:
+                onehot = steps['onehot']
+                self.categorical_feature = columns[0]
+                self.fill_category = steps['imputer'].statistics_[0]
+                categories = list(onehot.categories_[0])
+                drop = onehot.drop_idx_[0] if onehot.drop_idx_ is not None else None
+                self.categories = np.array(
+                    [c for i, c in enumerate(categories) if i != drop], dtype=object
+                )
+            else:
+                raise ValueError(f"Transformateur non supporté: {name}")
+
+    def _compile_knn(self, knn):
+        if knn.effective_metric_ != 'euclidean':
+            raise ValueError(f"Métrique KNN non supportée: {knn.effective_metric_}")
+        fit_X = knn._fit_X.astype(self.dtype)
+        self.knn = {
+            'fit_X': fit_X,
+            'fit_sq_norms': np.einsum('ij,ij->i', fit_X, fit_X),
+            'y': knn._y,
+            'k': knn.n_neighbors,
+            'weights': knn.weights,
+        }
+        self.classes_ = knn.classes_
+
+    def transform(self, X):
+        """Prétraitement + ACP en float32"""
+        numeric = np.empty((len(X), len(self.numeric_features)), dtype=self.dtype)
+        for j, name in enumerate(self.numeric_features):
+            column = X[name]
+            if column.dtype == object:
+                column = pd.to_numeric(column, errors='coerce')
+            numeric[:, j] = column.to_numpy()
+        missing = np.isnan(numeric)
+        if missing.any():
+            numeric = np.where(missing, self.medians, numeric)
+        numeric -= self.scale_mean
+        numeric /= self.scale
+
+        parts = [numeric]
+        if self.categorical_feature is not None:
+            # Nettoyage (TextCleaner) et encodage appliqués aux seules valeurs distinctes
+            codes, uniques = pd.factorize(X[self.categorical_feature].to_numpy())
+            cleaned = np.array([str(v).strip().capitalize() for v in uniques] + [self.fill_category],
+                               dtype=object)
+            onehot = (cleaned[:, None] == self.categories[None, :]).astype(self.dtype)
+            parts.append(onehot[codes])
+        Z = np.hstack(parts) if len(parts) > 1 else numeric
+
+        if self.pca_components is not None:
+            Z -= self.pca_mean
+            Z = Z @ self.pca_components
+        return Z
+
+    def predict_proba(self, X):
+        Z = self.transform(X)
+        if self.knn is None:
+            logits = Z @ self.coef + self.intercept
+            p1 = 1 / (1 + np.exp(-logits))
+        else:
+            p1 = np.concatenate([
+                self._knn_proba(Z[i:i + self.chunk_size])[:, 1]
+                for i in range(0, len(Z), self.chunk_size)
+            ])
+        if self.calibration is not None:
+            p1 = np.interp(p1, *self.calibration).astype(self.dtype)
+        return np.column_stack([1 - p1, p1])
+
+    def predict(self, X):
+        return self.classes_[(self.predict_proba(X)[:, 1] >= 0.5).astype(int)]
+
+    def _knn_proba(self, Z):
+        knn = self.knn
+        k = knn['k']
+        # Distances euclidiennes au carré: |a|² + |b|² - 2 a.b (un seul produit matriciel)
+        dist = np.einsum('ij,ij->i', Z, Z)[:, None] + knn['fit_sq_norms'][None, :]
+        dist -= 2 * (Z @ knn['fit_X'].T)
+        np.maximum(dist, 0, out=dist)
+        neighbors = np.argpartition(dist, k - 1, axis=1)[:, :k]
+        labels = knn['y'][neighbors]
+        if knn['weights'] == 'distance':
+            d = np.sqrt(np.take_along_axis(dist, neighbors, axis=1))
+            with np.errstate(divide='ignore'):
+                w = 1 / d
+            exact = np.isinf(w)
+            rows = exact.any(axis=1)
+            w[rows] = exact[rows]
+        else:
+            w = np.ones_like(labels, dtype=self.dtype)
+        proba = np.stack(
+            [(w * (labels == c)).sum(axis=1) for c in range(len(self.classes_))], axis=1
+        )
+        return proba / proba.sum(axis=1, keepdims=True)
+
+
+def compile_pipeline(model, dtype=np.float32):
+    """Construit le scorer float32 à partir d'un pipeline entraîné"""
+    return Float32Scorer(model, dtype=dtype)
+
+
+def validate(model, scorer, X):
+    """Écart de probabilité entre le pipeline float64 et le scorer float32"""
+    reference = model.predict_proba(X)[:, 1]
+    fast = scorer.predict_proba(X)[:, 1]
+    diff = np.abs(reference - fast)
+    return {
+        'rows': len(X),
+        'max_abs_diff': float(diff.max()),
+        'mean_abs_diff': float(diff.mean()),
+        'class_disagreements': int(((reference >= 0.5) != (fast >= 0.5)).sum()),
+    }
+
+
+def _measure(fn, X):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn(X)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def benchmark(model, scorer, X):
+    """Débit et pic mémoire du scoring par lots, float64 contre float32"""
+    t64, m64 = _measure(model.predict_proba, X)
+    t32, m32 = _measure(scorer.predict_proba, X)
+    return {
+        'rows': len(X),
+        'float64_rows_per_s': len(X) / t64,
+        'float32_rows_per_s': len(X) / t32,
+        'speedup': t64 / t32,
+        'float64_peak_mb': m64 / 1e6,
+        'float32_peak_mb': m32 / 1e6,
+        'memory_ratio': m64 / m32 if m32 else float('nan'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validation et benchmark du mode float32")
+    parser.add_argument('--model', default='Model.pkl')
+    parser.add_argument('--data', default='CHD.csv')
+    parser.add_argument('--rows', type=int, default=100000, help="Taille du lot de benchmark")
+    args = parser.parse_args()
+
+    model = joblib.load(args.model)
+    scorer = compile_pipeline(model)
+    X = read_chd(args.data)[0].drop('chd', axis=1)
+
+    print("="*80)
+    print("VALIDATION FLOAT32 CONTRE FLOAT64")
+    print("="*80)
+    for key, value in validate(model, scorer, X).items():
+        print(f"  {key}: {value}")
+
+    batch = X.sample(args.rows, replace=True, random_state=123).reset_index(drop=True)
+    print("\n" + "="*80)
+    print(f"BENCHMARK ({args.rows} lignes)")
+    print("="*80)
+    for key, value in benchmark(model, scorer, batch).items():
+        print(f"  {key}: {value:.2f}" if isinstance(value, float) else f"  {key}: {value}")
+
+
+if __name__ == '__main__':
+    main()
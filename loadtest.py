@@ -0,0 +1,205 @@
+"""Générateur de charge multi-sessions pour app.py.
+
+L'application est exécutée en processus avec le harnais de test de
+Streamlit (AppTest). Chaque session simulée remplit les six champs avec un
+patient de CHD.csv, clique sur « ANALYSER LE PROFIL CLINIQUE » et mesure
+la durée du rerun. L'exercice est répété pour plusieurs nombres de
+workers afin de voir comment le débit évolue.
+
+Les évaluations simulées ne doivent pas entrer dans le journal d'audit:
+CHD_AUDIT_DIR est pointé vers un répertoire temporaire, supprimé à la fin.
+Les sessions partagent un seul processus (threads, GIL): le CPU et la RSS
+« par session » sont les totaux du processus divisés par le nombre de
+sessions, donc des approximations.
+
+Usage:
+    python loadtest.py --sessions 32 --clicks 5 --workers 1,2,4,8
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from streamlit.testing.v1 import AppTest
+from schema import SCHEMA, FEATURES, read_chd
+from audit import close_all
+
+
+def _rss_mb():
+    """RSS courant (Linux), à défaut le maximum atteint"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6
+    except OSError:
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss / 1e6 if sys.platform == 'darwin' else rss / 1e3
+
+
+def _find(widgets, fragment):
+    for widget in widgets:
+        if fragment in widget.label:
+            return widget
+    raise LookupError(f"Widget introuvable: {fragment}")
+
+
+# Fragments des libellés des champs dans app.py
+LABELS = {
+    'sbp': 'Pression Artérielle',
+    'ldl': 'Cholestérol LDL',
+    'adiposity': 'Adiposité',
+    'obesity': 'Masse Corporelle',
+    'age': 'Âge',
+    'famhist': 'Antécédents Familiaux',
+}
+
+
+def load_patients(path='CHD.csv'):
+    """Profils réalistes tirés du dataset, ramenés dans les bornes des widgets"""
+    df, _ = read_chd(path)
+    patients = []
+    for row in df[FEATURES].to_dict('records'):
+        patient = {}
+        for name in FEATURES:
+            spec = SCHEMA[name]
+            value = row[name]
+            if spec.dtype == 'category':
+                patient[name] = value if isinstance(value, str) else spec.vocabulary[0]
+                continue
+            if value != value:
+                value = float(df[name].median())
+            value = float(np.clip(value, spec.min_value, spec.max_value))
+            patient[name] = int(round(value)) if name in ('sbp', 'age') else round(value, 2)
+        patients.append(patient)
+    return patients
+
+
+def run_session(app_path, patients, clicks, seed, timeout):
+    """Une session: chargement initial puis ``clicks`` analyses successives.
+
+    Un incident du harnais (AppTest exécuté dans des threads, page non
+    rendue) compte comme une erreur du clic concerné sans arrêter la charge.
+    """
+    rng = np.random.RandomState(seed)
+    at = AppTest.from_file(app_path, default_timeout=timeout)
+    start = time.perf_counter()
+    try:
+        at.run()
+    except Exception:
+        pass
+    initial = time.perf_counter() - start
+
+    latencies, errors = [], 0
+    for _ in range(clicks):
+        patient = patients[rng.randint(len(patients))]
+        try:
+            for name in ('sbp', 'ldl', 'adiposity', 'obesity', 'age'):
+                _find(at.number_input, LABELS[name]).set_value(patient[name])
+            _find(at.selectbox, LABELS['famhist']).set_value(patient['famhist'])
+            button = _find(at.button, 'ANALYSER LE PROFIL CLINIQUE')
+            start = time.perf_counter()
+            button.click().run()
+        except Exception:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+        if at.exception or at.error:
+            errors += 1
+    return initial, latencies, errors
+
+
+def run_load(app_path, patients, sessions, clicks, workers, timeout=60):
+    """Exécute ``sessions`` sessions avec ``workers`` sessions simultanées"""
+    rss_before = _rss_mb()
+    cpu_before = time.process_time()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(
+            lambda seed: run_session(app_path, patients, clicks, seed, timeout),
+            range(sessions)
+        ))
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_before
+
+    initial = np.array([r[0] for r in results]) * 1000
+    # Clics aboutis seulement (les incidents sont comptés dans 'errors')
+    latencies = np.concatenate([r[1] for r in results]) * 1000
+    total_clicks = len(latencies)
+    if total_clicks == 0:
+        latencies = np.array([np.nan])
+    return {
+        'workers': workers,
+        'sessions': sessions,
+        'clicks': total_clicks,
+        'errors': int(sum(r[2] for r in results)),
+        'elapsed_s': elapsed,
+        'throughput_clicks_per_s': total_clicks / elapsed,
+        'initial_load_p50_ms': float(np.percentile(initial, 50)),
+        'rerun_p50_ms': float(np.percentile(latencies, 50)),
+        'rerun_p95_ms': float(np.percentile(latencies, 95)),
+        'rerun_max_ms': float(np.max(latencies)),
+        # Totaux du processus répartis sur les sessions (approximation)
+        'cpu_s_per_session_approx': cpu / sessions,
+        'cpu_utilisation': cpu / elapsed,
+        'rss_mb': _rss_mb(),
+        'rss_delta_mb_per_session_approx': (_rss_mb() - rss_before) / sessions,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge multi-sessions de app.py")
+    parser.add_argument('--app', default='app.py')
+    parser.add_argument('--data', default='CHD.csv', help="Source des profils patients simulés")
+    parser.add_argument('--sessions', type=int, default=16, help="Sessions par palier")
+    parser.add_argument('--clicks', type=int, default=3, help="Analyses par session")
+    parser.add_argument('--workers', default='1,2,4,8', help="Paliers de sessions simultanées")
+    parser.add_argument('--timeout', type=float, default=60.0, help="Délai max d'un rerun (s)")
+    parser.add_argument('--output', help="Fichier JSON du rapport")
+    args = parser.parse_args()
+
+    patients = load_patients(args.data)
+    # Journal d'audit de l'application redirigé hors de audit/
+    audit_dir = tempfile.mkdtemp(prefix='loadtest-audit-')
+    os.environ['CHD_AUDIT_DIR'] = audit_dir
+    try:
+        # Session de chauffe: chargement du modèle et des ressources en cache
+        run_session(args.app, patients, 1, seed=0, timeout=args.timeout)
+
+        print("="*80)
+        print("TEST DE CHARGE")
+        print("="*80)
+        print(f"{'workers':>8} {'clics/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} "
+              f"{'~CPU s/sess':>11} {'CPU %':>7} {'RSS Mo':>8} {'erreurs':>8}")
+        reports = []
+        for workers in [int(w) for w in args.workers.split(',')]:
+            report = run_load(args.app, patients, args.sessions, args.clicks, workers, args.timeout)
+            reports.append(report)
+            print(f"{workers:>8} {report['throughput_clicks_per_s']:>9.2f} {report['rerun_p50_ms']:>9.1f} "
+                  f"{report['rerun_p95_ms']:>9.1f} {report['rerun_max_ms']:>9.1f} "
+                  f"{report['cpu_s_per_session_approx']:>11.3f} {report['cpu_utilisation'] * 100:>6.0f}% "
+                  f"{report['rss_mb']:>8.0f} {report['errors']:>8}")
+    finally:
+        # Le journal mis en cache par l'application est vidé et fermé avant la suppression
+        close_all(audit_dir)
+        shutil.rmtree(audit_dir, ignore_errors=True)
+
+    print("\n~ totaux du processus divisés par le nombre de sessions (threads partagés)")
+
+    base = reports[0]['throughput_clicks_per_s']
+    print("\nPassage à l'échelle (débit relatif au premier palier):")
+    for report in reports:
+        print(f"  {report['workers']:>3} workers: x{report['throughput_clicks_per_s'] / base:.2f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, indent=2)
+        print(f"\nRapport sauvegardé: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
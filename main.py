@@ -1,32 +1,60 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.model_selection import train_test_split, GridSearchCV
+from sklearn.model_selection import train_test_split, GridSearchCV, cross_val_predict
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
 from sklearn.impute import SimpleImputer
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
-from sklearn.decomposition import PCA
 from sklearn.linear_model import LogisticRegression
 from sklearn.neighbors import KNeighborsClassifier
-from sklearn.metrics import classification_report, accuracy_score
+from sklearn.metrics import classification_report, accuracy_score, brier_score_loss
 from imblearn.over_sampling import SMOTE
 from imblearn.pipeline import Pipeline as ImbPipeline
 import joblib
+import argparse
+import os
 import warnings
-from utils import TextCleaner
+from utils import TextCleaner, CalibratedModel, SharedPCA, fit_calibration
+from incremental import KNNRefresher
+from similarity import PatientIndex
+from uncertainty import BootstrapEnsemble
+from schema import read_chd
+from profiling import StageProfiler
+from audit import model_version
+from diagnostics import missing_counts, plot_missing_values, plot_pca_variance
 warnings.filterwarnings('ignore')
 
+# Options d'exécution
+parser = argparse.ArgumentParser(description="Entraînement et sélection du modèle de risque cardiaque")
+parser.add_argument('--profile', action='store_true',
+                    help="Mesure temps, CPU et RSS de chaque étape (rapport dans profile/)")
+parser.add_argument('--profile-memory', action='store_true',
+                    help="Ajoute le pic mémoire Python par étape (tracemalloc, ralentit l'exécution)")
+parser.add_argument('--cprofile', action='store_true',
+                    help="Ajoute une capture cProfile par étape et un fichier de piles pour flame graph")
+parser.add_argument('--no-plots', action='store_true',
+                    help="N'importe pas matplotlib et ne génère aucun graphique de diagnostic")
+args = parser.parse_args()
+
+profiler = StageProfiler(enabled=args.profile, cprofile=args.cprofile, memory=args.profile_memory)
+
 # =============================================================================
 # 1. CHARGEMENT ET EXPLORATION DU DATASET
 # =============================================================================
+profiler.start("1. CHARGEMENT ET EXPLORATION DU DATASET")
 print("="*80)
 print("1. CHARGEMENT ET EXPLORATION DU DATASET")
 print("="*80)
 
 # Charger le dataset avec séparateur point-virgule
-df = pd.read_csv('CHD.csv', sep=';')
+# (décodage des décimales supprimées et validation selon schema.py)
+df, parse_report = read_chd('CHD.csv')
+
+print("\nValidation du schéma:")
+print(f"  Lignes lues: {parse_report['rows_in']} | conservées: {parse_report['rows_out']} "
+      f"| avec valeurs rejetées: {parse_report['rejected_rows']}")
+for column, counts in parse_report['columns'].items():
+    print(f"  {column}: {counts}")
 
 # Afficher les premières lignes
 print("\nPremières lignes du dataset:")
@@ -40,17 +68,18 @@ print(df.info())
 print("\nDistribution de la variable famhist:")
 print(df['famhist'].value_counts())
 
-# Visualiser les valeurs manquantes
-plt.figure(figsize=(10, 6))
-sns.heatmap(df.isnull(), cbar=True, yticklabels=False, cmap='viridis')
-plt.title('Valeurs manquantes dans le dataset')
-plt.tight_layout()
-plt.savefig('missing_values.png')
-print("\nHeatmap des valeurs manquantes sauvegardée: missing_values.png")
+# Valeurs manquantes agrégées par colonne et par bloc de lignes
+missing_per_column, missing_per_block = missing_counts(df)
+print("\nValeurs manquantes par colonne:")
+print(missing_per_column)
+if not args.no_plots:
+    plot_missing_values(missing_per_column, missing_per_block, 'missing_values.png')
+    print("\nHeatmap des valeurs manquantes sauvegardée: missing_values.png")
 
 # =============================================================================
 # 2. SÉPARATION DU DATASET
 # =============================================================================
+profiler.start("2. SÉPARATION DU DATASET")
 print("\n" + "="*80)
 print("2. SÉPARATION DU DATASET")
 print("="*80)
@@ -70,6 +99,7 @@ print(f"Taille de l'ensemble de test: {X_test.shape}")
 # =============================================================================
 # 3. PRÉTRAITEMENT DES VARIABLES NUMÉRIQUES
 # =============================================================================
+profiler.start("3. PRÉTRAITEMENT DES VARIABLES NUMÉRIQUES")
 print("\n" + "="*80)
 print("3. PRÉTRAITEMENT DES VARIABLES NUMÉRIQUES")
 print("="*80)
@@ -89,6 +119,7 @@ print("  2. StandardScaler: Normalise les données (moyenne=0, écart-type=1)")
 # =============================================================================
 # 4. PRÉTRAITEMENT DE LA VARIABLE CATÉGORIELLE
 # =============================================================================
+profiler.start("4. PRÉTRAITEMENT DE LA VARIABLE CATÉGORIELLE")
 print("\n" + "="*80)
 print("4. PRÉTRAITEMENT DE LA VARIABLE CATÉGORIELLE")
 print("="*80)
@@ -110,6 +141,7 @@ print("  2. OneHotEncoder: Encode les catégories en variables binaires")
 # =============================================================================
 # 5. CONSTRUCTION D'UN PRÉPROCESSEUR COMPLET
 # =============================================================================
+profiler.start("5. CONSTRUCTION DU PRÉPROCESSEUR COMPLET")
 print("\n" + "="*80)
 print("5. CONSTRUCTION DU PRÉPROCESSEUR COMPLET")
 print("="*80)
@@ -125,6 +157,7 @@ print("\nColumnTransformer créé combinant les deux pipelines")
 # =============================================================================
 # 6. MODÈLE SUPERVISÉ AVEC ACP
 # =============================================================================
+profiler.start("6. MODÈLE AVEC ACP + RÉGRESSION LOGISTIQUE")
 print("\n" + "="*80)
 print("6. MODÈLE AVEC ACP + RÉGRESSION LOGISTIQUE")
 print("="*80)
@@ -133,7 +166,7 @@ print("="*80)
 pipeline_pca = Pipeline([
     ('cleaner', TextCleaner()),
     ('preprocessor', preprocessor),
-    ('pca', PCA(n_components=0.95)),  # 95% de variance
+    ('pca', SharedPCA(n_components=0.95)),  # 95% de variance (SVD partagée)
     ('classifier', LogisticRegression(random_state=123, max_iter=1000))
 ])
 
@@ -153,6 +186,7 @@ print(f"\nAccuracy: {accuracy_pca:.4f}")
 # =============================================================================
 # 7. VARIANCE EXPLIQUÉE PAR L'ACP
 # =============================================================================
+profiler.start("7. ANALYSE DE LA VARIANCE EXPLIQUÉE PAR L'ACP")
 print("\n" + "="*80)
 print("7. ANALYSE DE LA VARIANCE EXPLIQUÉE PAR L'ACP")
 print("="*80)
@@ -160,36 +194,28 @@ print("="*80)
 # Récupérer l'ACP du pipeline
 pca = pipeline_pca.named_steps['pca']
 
-# Variance expliquée
+# Variance expliquée (spectre complet issu de la même décomposition)
 explained_variance = pca.explained_variance_ratio_
-cumulative_variance = np.cumsum(explained_variance)
+cumulative_variance = np.cumsum(pca.full_explained_variance_ratio_)
 
 print(f"\nNombre de composantes retenues: {pca.n_components_}")
 print(f"Variance expliquée par composante: {explained_variance}")
 print(f"Variance cumulative: {cumulative_variance}")
 
-# Tracer la variance cumulative
-plt.figure(figsize=(10, 6))
-plt.plot(range(1, len(cumulative_variance) + 1), cumulative_variance, 'bo-')
-plt.axhline(y=0.90, color='r', linestyle='--', label='90% de variance')
-plt.xlabel('Nombre de composantes')
-plt.ylabel('Variance expliquée cumulative')
-plt.title('Variance expliquée par l\'ACP')
-plt.legend()
-plt.grid(True)
-plt.tight_layout()
-plt.savefig('pca_variance.png')
-print("\nGraphique de variance sauvegardé: pca_variance.png")
+# Tracer la variance cumulative (décomposition déjà ajustée)
+if not args.no_plots:
+    plot_pca_variance(cumulative_variance, 'pca_variance.png')
+    print("\nGraphique de variance sauvegardé: pca_variance.png")
 
 # Nombre de composantes pour 90%
 n_components_90 = np.argmax(cumulative_variance >= 0.90) + 1
 print(f"\nNombre de composantes pour 90% de variance: {n_components_90}")
 
-# Réentraîner avec n_components fixe si nécessaire
+# Réentraîner avec n_components fixe si nécessaire (la SVD déjà calculée est réutilisée)
 pipeline_pca_90 = Pipeline([
     ('cleaner', TextCleaner()),
     ('preprocessor', preprocessor),
-    ('pca', PCA(n_components=n_components_90)),
+    ('pca', SharedPCA(n_components=n_components_90)),
     ('classifier', LogisticRegression(random_state=123, max_iter=1000))
 ])
 
@@ -201,6 +227,7 @@ print(f"\nAccuracy avec {n_components_90} composantes: {accuracy_pca_90:.4f}")
 # =============================================================================
 # 8. COMPARAISON AVEC UN MODÈLE SANS ACP
 # =============================================================================
+profiler.start("8. MODÈLE SANS ACP")
 print("\n" + "="*80)
 print("8. MODÈLE SANS ACP")
 print("="*80)
@@ -238,6 +265,7 @@ else:
 # =============================================================================
 # 9. TEST D'UN MODÈLE KNN
 # =============================================================================
+profiler.start("9. MODÈLE KNN AVEC SMOTE")
 print("\n" + "="*80)
 print("9. MODÈLE KNN AVEC SMOTE")
 print("="*80)
@@ -247,7 +275,7 @@ pipeline_knn = ImbPipeline([
     ('cleaner', TextCleaner()),
     ('preprocessor', preprocessor),
     ('smote', SMOTE(random_state=123)),
-    ('pca', PCA(n_components=n_components_90)),
+    ('pca', SharedPCA(n_components=n_components_90)),
     ('classifier', KNeighborsClassifier())
 ])
 
@@ -261,7 +289,8 @@ grid_search = GridSearchCV(
     param_grid,
     cv=5,
     scoring='accuracy',
-    n_jobs=-1,
+    # Profilage: les workers parallèles échapperaient aux mesures du processus principal
+    n_jobs=1 if profiler.enabled else -1,
     verbose=1
 )
 
@@ -306,23 +335,70 @@ print(f"\n🏆 MEILLEUR MODÈLE: {best_model_name} (Accuracy: {best_accuracy:.4f
 # =============================================================================
 # 10. ENTRAÎNEMENT FINAL ET SAUVEGARDE
 # =============================================================================
+profiler.start("10.1 Calibration des probabilités")
 print("\n" + "="*80)
 print("10. ENTRAÎNEMENT FINAL ET SAUVEGARDE")
 print("="*80)
 
+# Calibration des probabilités sur des prédictions hors échantillon (5 plis)
+print("\nCalibration des probabilités (isotonique, prédictions hors échantillon)...")
+oof_proba = cross_val_predict(best_model, X, y, cv=5, method='predict_proba')[:, 1]
+thresholds, values = fit_calibration(oof_proba, y, method='isotonic')
+calibrated_oof = np.interp(oof_proba, thresholds, values)
+print(f"  Brier score brut:     {brier_score_loss(y, oof_proba):.4f}")
+print(f"  Brier score calibré:  {brier_score_loss(y, calibrated_oof):.4f}")
+print(f"  Table de calibration: {len(thresholds)} points")
+
 # Entraîner sur toutes les données
+profiler.start("10.2 Entraînement final (best_model.fit)")
 print("\nEntraînement du meilleur modèle sur toutes les données...")
 best_model.fit(X, y)
 
-# Sauvegarder
-joblib.dump(best_model, 'Model.pkl')
+# Sauvegarder (pipeline + table de calibration)
+final_model = CalibratedModel(best_model, thresholds, values)
+joblib.dump(final_model, 'Model.pkl')
 print("\n✅ Modèle sauvegardé: Model.pkl")
 
+# Ensemble bootstrap pour les intervalles d'incertitude
+profiler.start("10.3 Ensemble bootstrap")
+print("\nEntraînement de l'ensemble bootstrap (200 membres)...")
+ensemble = BootstrapEnsemble(n_members=200, random_state=123).fit(final_model, X, y)
+joblib.dump(ensemble, 'Ensemble.pkl')
+print("✅ Ensemble bootstrap sauvegardé: Ensemble.pkl")
+
+# Index des patients similaires et état incrémental
+profiler.start("10.4 Index des patients similaires")
+patient_index = PatientIndex(Pipeline([
+    ('cleaner', TextCleaner()),
+    ('preprocessor', preprocessor)
+])).fit(X, y)
+joblib.dump(patient_index, 'Neighbors.pkl')
+print("✅ Index des patients similaires sauvegardé: Neighbors.pkl")
+
+# État pour les mises à jour incrémentales (python incremental.py nouveaux.csv)
+if best_model_name == 'KNN':
+    refresher = KNNRefresher(best_model, X, y, k_grid=param_grid['classifier__n_neighbors'])
+    refresher.model_version = model_version('Model.pkl')
+    joblib.dump(refresher, 'KNN_state.pkl')
+    print("✅ État KNN incrémental sauvegardé: KNN_state.pkl")
+elif os.path.exists('KNN_state.pkl'):
+    # Un état laissé par une exécution précédente décrirait un autre modèle
+    os.remove('KNN_state.pkl')
+    print("KNN_state.pkl supprimé (le meilleur modèle n'est pas KNN)")
+
+profiler.stop()
 print("\n" + "="*80)
 print("ANALYSE TERMINÉE!")
 print("="*80)
 print("\nFichiers générés:")
-print("  - Model.pkl (modèle sauvegardé)")
-print("  - missing_values.png (heatmap)")
-print("  - pca_variance.png (variance expliquée)")
-print("\nProchaine étape: Lancer l'application Streamlit avec 'streamlit run app.py'")
\ No newline at end of file
+print("  - Model.pkl (modèle calibré sauvegardé)")
+print("  - Ensemble.pkl (ensemble bootstrap pour les intervalles)")
+print("  - Neighbors.pkl (index des patients similaires)")
+if best_model_name == 'KNN':
+    print("  - KNN_state.pkl (état pour mises à jour incrémentales)")
+if not args.no_plots:
+    print("  - missing_values.png (valeurs manquantes agrégées)")
+    print("  - pca_variance.png (variance expliquée)")
+print("\nProchaine étape: Lancer l'application Streamlit avec 'streamlit run app.py'")
+
+profiler.finish()
\ No newline at end of file
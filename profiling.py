@@ -0,0 +1,225 @@
+"""Profilage par étape de l'entraînement (main.py --profile).
+
+Chaque étape numérotée de main.py est mesurée (temps réel, temps CPU, RSS
+maximal du processus). Le pic mémoire Python (tracemalloc) est une option
+séparée, --profile-memory: le traçage des allocations ralentit fortement
+l'exécution (environ x4 ici) et fausserait les temps. Avec --cprofile,
+chaque étape est aussi capturée par cProfile (fonctions les plus coûteuses). Dans ce mode, le thread principal est
+aussi échantillonné toutes les quelques millisecondes: chaque échantillon
+est sa pile d'appels complète, de la racine à la fonction en cours, et
+profile/stacks.folded (lisible par flamegraph.pl ou speedscope) cumule
+ces piles, préfixées par l'étape, en microsecondes estimées. Le rapport
+profile/report.json est comparé à celui de l'exécution précédente, à
+condition qu'elle ait été faite dans le même mode (cProfile, mémoire).
+
+Les mesures ne voient que le processus principal: le travail de processus
+workers (n_jobs) leur échappe. main.py lance donc la recherche par grille
+avec n_jobs=1 lorsque le profilage est actif.
+"""
+import cProfile
+import datetime
+import json
+import os
+import pstats
+import re
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+
+
+def _rss_mb():
+    # ru_maxrss est en kilo-octets sous Linux, en octets sous macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def _label(func):
+    filename, line, name = func
+    name = re.sub(r' at 0x[0-9a-f]+', '', name)
+    if filename == '~':
+        return name
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+class _StackSampler:
+    """Échantillonne la pile complète d'un thread et cumule les piles repliées"""
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.folded = {}
+        self.stage = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        weight = int(self.interval * 1e6)
+        while not self._stop.wait(self.interval):
+            stage = self.stage
+            frame = sys._current_frames().get(self.thread_id)
+            if stage is None or frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(_label((code.co_filename, code.co_firstlineno, code.co_name)))
+                frame = frame.f_back
+            key = ';'.join([stage.replace(';', ',')] + [label.replace(';', ',') for label in reversed(stack)])
+            self.folded[key] = self.folded.get(key, 0) + weight
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+
+
+class StageProfiler:
+    """Mesure les étapes successives d'un script; inactif par défaut"""
+
+    def __init__(self, enabled=False, cprofile=False, memory=False, output_dir='profile',
+                 regression_ratio=0.2, min_delta_s=0.05):
+        self.enabled = enabled or cprofile or memory
+        self.cprofile = cprofile
+        self.memory = memory
+        self.output_dir = output_dir
+        self.regression_ratio = regression_ratio
+        self.min_delta_s = min_delta_s
+        self.stages = []
+        self._current = None
+        self._sampler = _StackSampler(threading.get_ident()) if self.cprofile else None
+        if self.memory:
+            tracemalloc.start()
+
+    def start(self, name):
+        """Termine l'étape en cours et démarre la suivante"""
+        if not self.enabled:
+            return
+        self.stop()
+        if self.memory:
+            tracemalloc.reset_peak()
+        self._current = {
+            'name': name,
+            'traced': tracemalloc.get_traced_memory()[0] if self.memory else 0,
+            'rss': _rss_mb(),
+            'wall': time.perf_counter(),
+            'cpu': time.process_time(),
+            'profile': cProfile.Profile() if self.cprofile else None,
+        }
+        if self._current['profile'] is not None:
+            self._current['profile'].enable()
+        if self._sampler is not None:
+            self._sampler.stage = name
+
+    def stop(self):
+        if not self.enabled or self._current is None:
+            return
+        current, self._current = self._current, None
+        if self._sampler is not None:
+            self._sampler.stage = None
+        profile = current['profile']
+        if profile is not None:
+            profile.disable()
+        stage = {
+            'name': current['name'],
+            'wall_s': time.perf_counter() - current['wall'],
+            'cpu_s': time.process_time() - current['cpu'],
+            'rss_max_mb': _rss_mb(),
+            'rss_max_increase_mb': _rss_mb() - current['rss'],
+        }
+        if self.memory:
+            _, peak = tracemalloc.get_traced_memory()
+            stage['peak_mb'] = peak / 1e6
+            stage['peak_increase_mb'] = (peak - current['traced']) / 1e6
+        if profile is not None:
+            stage['top_functions'] = self._top_functions(profile)
+        self.stages.append(stage)
+
+    def _top_functions(self, profile, top=10):
+        """Fonctions au temps cumulé le plus élevé pendant l'étape"""
+        stats = pstats.Stats(profile).stats
+        ranked = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:top]
+        return [
+            {'function': _label(func), 'calls': nc, 'tottime_s': tt, 'cumtime_s': ct}
+            for func, (_, nc, tt, ct, _) in ranked
+        ]
+
+    def mode(self):
+        return {'cprofile': self.cprofile, 'memory': self.memory}
+
+    def compare(self, previous):
+        """Étapes plus lentes ou plus gourmandes que lors de l'exécution précédente"""
+        if previous.get('mode') != self.mode():
+            # cProfile et tracemalloc ralentissent l'exécution: seul un même mode est comparable
+            return None
+        before = {stage['name']: stage for stage in previous.get('stages', [])}
+        regressions = []
+        for stage in self.stages:
+            old = before.get(stage['name'])
+            if old is None:
+                continue
+            for metric in ('wall_s', 'peak_increase_mb') if self.memory else ('wall_s',):
+                delta = stage[metric] - old[metric]
+                threshold = self.min_delta_s if metric == 'wall_s' else 1.0
+                if delta > threshold and stage[metric] > old[metric] * (1 + self.regression_ratio):
+                    regressions.append({
+                        'stage': stage['name'],
+                        'metric': metric,
+                        'previous': old[metric],
+                        'current': stage[metric],
+                    })
+        return regressions
+
+    def finish(self):
+        """Écrit le rapport JSON et les piles, puis affiche le résumé et les régressions"""
+        if not self.enabled:
+            return None
+        self.stop()
+        if self.memory:
+            tracemalloc.stop()
+        os.makedirs(self.output_dir, exist_ok=True)
+        report_path = os.path.join(self.output_dir, 'report.json')
+
+        previous = None
+        if os.path.exists(report_path):
+            with open(report_path, encoding='utf-8') as f:
+                previous = json.load(f)
+            os.replace(report_path, os.path.join(self.output_dir, 'report.previous.json'))
+
+        report = {
+            'created': datetime.datetime.now().isoformat(timespec='seconds'),
+            'mode': self.mode(),
+            'total_wall_s': sum(stage['wall_s'] for stage in self.stages),
+            'stages': self.stages,
+            'regressions': (self.compare(previous) if previous else None) or [],
+        }
+        comparable = previous is not None and previous.get('mode') == self.mode()
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        if self._sampler is not None:
+            self._sampler.close()
+            with open(os.path.join(self.output_dir, 'stacks.folded'), 'w', encoding='utf-8') as f:
+                for stack, weight in sorted(self._sampler.folded.items()):
+                    f.write(f"{stack} {weight}\n")
+
+        print("\n" + "="*80)
+        print("PROFIL DES ÉTAPES")
+        print("="*80)
+        for stage in self.stages:
+            memory = (f"pic +{stage['peak_increase_mb']:7.1f} Mo" if self.memory
+                      else f"RSS max {stage['rss_max_mb']:7.0f} Mo")
+            print(f"  {stage['name'][:45]:<45} {stage['wall_s']:8.2f} s  "
+                  f"CPU {stage['cpu_s']:7.2f} s  {memory}")
+        print(f"\n  Total: {report['total_wall_s']:.2f} s | rapport: {report_path}")
+        if previous is None:
+            print("  (aucun rapport précédent pour comparaison)")
+        elif not comparable:
+            print("  (rapport précédent obtenu dans un autre mode, comparaison ignorée)")
+        elif report['regressions']:
+            print("\n  ⚠️ Régressions par rapport à l'exécution précédente:")
+            for r in report['regressions']:
+                print(f"    {r['stage']} [{r['metric']}]: {r['previous']:.2f} -> {r['current']:.2f}")
+        else:
+            print("  Aucune régression par rapport à l'exécution précédente")
+        return report
@@ -0,0 +1,177 @@
+"""Rejoue des requêtes de scoring enregistrées (JSONL) sur un modèle.
+
+Usage:
+    python replay.py audit/predictions*.jsonl --model Model.pkl \\
+        --reference Ancien_Model.pkl --concurrency 8 --rate 200
+
+Chaque ligne est soit un enregistrement du journal d'audit (clé ``input``),
+soit un dictionnaire plat contenant les six variables cliniques.
+
+Sans ``--reference``, la parité est mesurée contre les probabilités
+enregistrées. L'application les a calculées sur la saisie typée par le
+schéma (float32, validate_input) alors que le rejeu évalue les valeurs
+brutes en float64: de petits écarts de probabilité sont donc attendus.
+"""
+import argparse
+import glob
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+from utils import TextCleaner
+from inference import compile_pipeline
+from schema import FEATURES
+
+
+def iter_requests(paths):
+    """Lit les fichiers ligne par ligne sans les charger en mémoire"""
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    yield None, None
+                    continue
+                row = record.get('input', record)
+                if not all(name in row for name in FEATURES):
+                    yield None, None
+                    continue
+                recorded = record.get('probabilities')
+                yield {name: row[name] for name in FEATURES}, recorded
+
+
+def model_scorer(model):
+    """Adapte un modèle scikit-learn en fonction DataFrame -> probabilité de la classe 1"""
+    def score(frame):
+        return model.predict_proba(frame)[:, 1]
+    return score
+
+
+def replay(requests, scorer, reference=None, concurrency=1, rate=None):
+    """Envoie les requêtes au scorer et retourne le rapport de débit et de parité.
+
+    ``reference`` est un second scorer; à défaut, la comparaison se fait avec
+    les probabilités enregistrées dans le journal lorsqu'elles existent.
+    """
+    latencies = []
+    diffs = []
+    disagreements = 0
+    errors = 0
+    skipped = 0
+    lock = threading.Lock()
+    in_flight = threading.BoundedSemaphore(concurrency * 2)
+
+    def run_one(row, recorded):
+        nonlocal disagreements, errors
+        frame = pd.DataFrame([row], columns=FEATURES)
+        try:
+            start = time.perf_counter()
+            proba = float(scorer(frame)[0])
+            latency = time.perf_counter() - start
+            if reference is not None:
+                expected = float(reference(frame)[0])
+            elif recorded is not None:
+                expected = float(recorded[1])
+            else:
+                expected = None
+        except Exception:
+            with lock:
+                errors += 1
+            return
+        finally:
+            in_flight.release()
+        with lock:
+            latencies.append(latency)
+            if expected is not None:
+                diffs.append(abs(proba - expected))
+                if (proba >= 0.5) != (expected >= 0.5):
+                    disagreements += 1
+
+    sent = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for row, recorded in requests:
+            if row is None:
+                skipped += 1
+                continue
+            if rate:
+                # Cadence fixe: la n-ième requête part au plus tôt à n / rate secondes
+                delay = start + sent / rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            sent += 1
+            in_flight.acquire()
+            executor.submit(run_one, row, recorded)
+    elapsed = time.perf_counter() - start
+
+    latencies_ms = np.array(latencies) * 1000
+    report = {
+        'requests': len(latencies),
+        'errors': errors,
+        'skipped': skipped,
+        'elapsed_s': elapsed,
+        'throughput_rps': len(latencies) / elapsed if elapsed > 0 else 0.0,
+        'concurrency': concurrency,
+        'rate': rate,
+    }
+    if len(latencies_ms):
+        for q in (50, 90, 95, 99):
+            report[f'latency_p{q}_ms'] = float(np.percentile(latencies_ms, q))
+        report['latency_max_ms'] = float(latencies_ms.max())
+    if diffs:
+        diffs = np.array(diffs)
+        report['compared'] = len(diffs)
+        report['proba_diff_max'] = float(diffs.max())
+        report['proba_diff_mean'] = float(diffs.mean())
+        report['proba_diff_p99'] = float(np.percentile(diffs, 99))
+        report['class_disagreements'] = disagreements
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rejeu de requêtes de scoring enregistrées")
+    parser.add_argument('paths', nargs='+', help="Fichiers JSONL (motifs glob acceptés)")
+    parser.add_argument('--model', default='Model.pkl', help="Modèle évalué")
+    parser.add_argument('--reference', help="Modèle de référence pour la parité")
+    parser.add_argument('--float32', action='store_true',
+                        help="Évalue le modèle en mode float32 (inference.py)")
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--rate', type=float, help="Requêtes par seconde (illimité par défaut)")
+    parser.add_argument('--output', help="Fichier JSON du rapport")
+    args = parser.parse_args()
+
+    unmatched = [pattern for pattern in args.paths if not glob.glob(pattern)]
+    if unmatched:
+        parser.error(f"aucun fichier ne correspond à: {', '.join(unmatched)}")
+    paths = sorted(p for pattern in args.paths for p in glob.glob(pattern))
+    model = joblib.load(args.model)
+    if args.float32:
+        model = compile_pipeline(model)
+    scorer = model_scorer(model)
+    reference = model_scorer(joblib.load(args.reference)) if args.reference else None
+
+    report = replay(iter_requests(paths), scorer, reference,
+                    concurrency=args.concurrency, rate=args.rate)
+
+    print("="*80)
+    print("RAPPORT DE REJEU")
+    print("="*80)
+    for key, value in report.items():
+        print(f"  {key}: {value:.4f}" if isinstance(value, float) else f"  {key}: {value}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nRapport sauvegardé: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+"""Schéma déclaratif du dataset CHD et parseur/validateur vectorisé.
+
+Dans CHD.csv, le séparateur décimal de ldl, adiposity et obesity a été
+supprimé (``ldl=573`` pour 5.73, ``obesity=253`` pour 25.3). Le schéma
+indique, pour chaque colonne, le type compact, le nombre de décimales
+supprimées, la plage valide et le vocabulaire; le même schéma sert à
+l'ingestion dans main.py et à la validation des saisies dans app.py.
+
+Le décodage est vérifié par les exemples ci-dessous (depuis la racine du
+dépôt): ``python -m doctest schema.py``.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class ColumnSpec:
+    """Description d'une colonne: type, décimales supprimées, plage et vocabulaire"""
+    dtype: str
+    scale: int = 0
+    min_value: float = None
+    max_value: float = None
+    vocabulary: tuple = None
+    required: bool = False
+
+
+SCHEMA = {
+    'sbp': ColumnSpec('float32', min_value=80, max_value=250),
+    'ldl': ColumnSpec('float32', scale=2, min_value=0.9, max_value=16.0),
+    'adiposity': ColumnSpec('float32', scale=2, min_value=5.0, max_value=50.0),
+    'famhist': ColumnSpec('category', vocabulary=('Absent', 'Present')),
+    'obesity': ColumnSpec('float32', scale=2, min_value=14.0, max_value=50.0),
+    'age': ColumnSpec('float32', min_value=15, max_value=100),
+    'chd': ColumnSpec('int8', min_value=0, max_value=1, required=True),
+}
+
+FEATURES = [name for name in SCHEMA if name != 'chd']
+
+
+class SchemaError(ValueError):
+    """Données non conformes au schéma (mode errors='raise')"""
+    def __init__(self, report):
+        self.report = report
+        problems = ', '.join(
+            f"{name}: {', '.join(f'{k}={v}' for k, v in counts.items() if v)}"
+            for name, counts in report['columns'].items()
+            if counts['invalid'] or counts['out_of_range']
+        )
+        super().__init__(f"Données non conformes au schéma ({problems})")
+
+
+def _decode_numeric(column, spec, fixed_point):
+    """Valeurs décodées et masques (invalide, hors plage, échelle réparée).
+
+    Les zéros finaux supprimés sont restaurés tant que la valeur reste sous
+    le minimum de la plage:
+
+    >>> raw = pd.Series([573, 98, 18, 4, 1533, 9999, None])
+    >>> values, invalid, out_of_range, repaired = _decode_numeric(raw, SCHEMA['ldl'], True)
+    >>> values.round(2).tolist()[:6]
+    [5.73, 0.98, 1.8, 4.0, 15.33, 99.99]
+    >>> repaired.tolist()
+    [False, False, True, True, False, False, False]
+    >>> out_of_range.tolist()
+    [False, False, False, False, False, True, False]
+    >>> values, *_ = _decode_numeric(pd.Series([2887, 253, 20]), SCHEMA['obesity'], True)
+    >>> values.round(2).tolist()
+    [28.87, 25.3, 20.0]
+    """
+    values = pd.to_numeric(column, errors='coerce').to_numpy(dtype=np.float64, copy=True)
+    invalid = np.isnan(values) & column.notna().to_numpy()
+    repaired = np.zeros(len(values), dtype=bool)
+    if fixed_point and spec.scale:
+        values = values / 10 ** spec.scale
+        # Les zéros finaux ont aussi été supprimés (25.30 -> 253): on remonte d'une décimale
+        for _ in range(spec.scale):
+            low = values < spec.min_value
+            values[low] *= 10
+            repaired |= low
+    out_of_range = np.zeros(len(values), dtype=bool)
+    if spec.min_value is not None:
+        out_of_range |= values < spec.min_value
+    if spec.max_value is not None:
+        out_of_range |= values > spec.max_value
+    repaired &= ~out_of_range
+    return values, invalid, out_of_range, repaired
+
+
+def _decode_category(column, spec):
+    # Normalisation (comme TextCleaner) effectuée sur les seules valeurs distinctes
+    codes, uniques = pd.factorize(column.to_numpy())
+    cleaned = np.array([str(v).strip().capitalize() for v in uniques], dtype=object)
+    known = np.isin(cleaned, spec.vocabulary)
+    mapped = np.where(known, cleaned, None)
+    values = np.where(codes >= 0, mapped[codes] if len(mapped) else None, None)
+    invalid = (codes >= 0) & ~known[codes] if len(known) else np.zeros(len(codes), dtype=bool)
+    return values, invalid
+
+
+def parse_frame(raw, schema=SCHEMA, fixed_point=True, errors='repair'):
+    """Décode et valide un DataFrame brut en une passe vectorisée.
+
+    ``errors`` vaut 'raise' (SchemaError), 'repair' (valeurs fautives mises à
+    NaN, imputées ensuite par le pipeline) ou 'drop' (lignes fautives retirées).
+    Retourne le DataFrame typé et un rapport de validation.
+    """
+    if errors not in ('raise', 'repair', 'drop'):
+        raise ValueError(f"Mode d'erreur inconnu: {errors}")
+
+    missing_columns = [name for name, spec in schema.items()
+                       if spec.required and name not in raw.columns]
+    if missing_columns:
+        raise ValueError(f"Colonnes obligatoires absentes: {missing_columns}")
+
+    columns = {}
+    report = {'rows_in': len(raw), 'columns': {}}
+    bad_rows = np.zeros(len(raw), dtype=bool)
+
+    for name, spec in schema.items():
+        if name not in raw.columns:
+            continue
+        column = raw[name]
+        if spec.dtype == 'category':
+            values, invalid = _decode_category(column, spec)
+            out_of_range = repaired = np.zeros(len(values), dtype=bool)
+        else:
+            values, invalid, out_of_range, repaired = _decode_numeric(column, spec, fixed_point)
+
+        bad = invalid | out_of_range
+        missing = column.isna().to_numpy()
+        if spec.required:
+            bad |= missing
+        bad_rows |= bad
+        if spec.dtype == 'category':
+            values[bad] = None
+            columns[name] = pd.Categorical(values, categories=spec.vocabulary)
+        else:
+            values[bad] = np.nan
+            columns[name] = values
+        report['columns'][name] = {
+            'missing': int(missing.sum()),
+            'invalid': int(invalid.sum()),
+            'out_of_range': int(out_of_range.sum()),
+            'repaired_scale': int(repaired.sum()),
+        }
+
+    frame = pd.DataFrame(columns, index=raw.index)
+    report['rejected_rows'] = int(bad_rows.sum())
+
+    if errors == 'raise' and bad_rows.any():
+        raise SchemaError(report)
+    if errors == 'drop':
+        frame = frame[~bad_rows]
+
+    # Conversion vers les types compacts une fois les lignes fautives traitées
+    for name, spec in schema.items():
+        if name in frame.columns and spec.dtype != 'category':
+            if spec.required and errors == 'repair':
+                frame = frame[frame[name].notna()]
+            frame[name] = frame[name].astype(spec.dtype)
+    report['rows_out'] = len(frame)
+    return frame.reset_index(drop=True), report
+
+
+def read_chd(path, errors='repair'):
+    """Lit un fichier au format de CHD.csv (séparateur ';', décimales supprimées)
+
+    >>> df, report = read_chd('CHD.csv')
+    >>> df.loc[0, ['ldl', 'adiposity', 'obesity']].astype(float).round(2).tolist()
+    [5.73, 23.11, 25.3]
+    >>> df[['ldl', 'adiposity', 'obesity']].agg(['min', 'max']).astype(float).round(2).values.tolist()
+    [[1.07, 6.74, 14.7], [15.33, 42.49, 46.58]]
+    >>> report['rejected_rows']
+    0
+    """
+    raw = pd.read_csv(path, sep=';')
+    return parse_frame(raw, fixed_point=True, errors=errors)
+
+
+def validate_input(frame):
+    """Valide une saisie déjà en unités cliniques (scoring); lève SchemaError si non conforme"""
+    features = {name: SCHEMA[name] for name in FEATURES}
+    parsed, _ = parse_frame(frame, schema=features, fixed_point=False, errors='raise')
+    return parsed
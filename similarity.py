@@ -0,0 +1,106 @@
+"""Recherche des patients similaires dans la cohorte d'entraînement.
+
+main.py construit un index KD-tree sur les données prétraitées (variables
+standardisées + famhist encodé) et le sauvegarde dans Neighbors.pkl;
+app.py l'interroge au moment de la prédiction.
+
+Usage (benchmark):
+    python similarity.py --index Neighbors.pkl --rows 1000000
+"""
+import argparse
+import time
+
+import joblib
+import numpy as np
+from sklearn.base import clone
+from sklearn.neighbors import KDTree
+from inference import compile_pipeline
+from utils import TextCleaner
+from schema import SCHEMA, read_chd
+
+
+class PatientIndex:
+    """Index des patients de la cohorte, interrogeable en une fraction de milliseconde"""
+
+    def __init__(self, preprocessing, leaf_size=40):
+        self.preprocessing = preprocessing
+        self.leaf_size = leaf_size
+
+    def fit(self, X, y):
+        self.preprocessing_ = clone(self.preprocessing).fit(X)
+        # Prétraitement compilé en numpy: évite le coût fixe du ColumnTransformer par requête
+        self.encoder_ = compile_pipeline(self.preprocessing_, dtype=np.float64)
+        self.tree_ = KDTree(self.encoder_.transform(X), leaf_size=self.leaf_size)
+
+        # Cohorte conservée sous forme compacte pour l'affichage
+        cohort = X.reset_index(drop=True).copy()
+        for column in cohort.columns:
+            if column == 'famhist':
+                cohort[column] = cohort[column].str.strip().str.capitalize().astype('category')
+            else:
+                cohort[column] = cohort[column].astype('float32')
+        self.cohort_ = cohort
+        self.outcomes_ = np.asarray(y, dtype=np.int8)
+        return self
+
+    def kneighbors(self, X, k=5):
+        """Distances et indices des k patients les plus proches (mode batch)"""
+        return self.tree_.query(self.encoder_.transform(X), k=k)
+
+    def query(self, X, k=5):
+        """Les k patients les plus proches du premier individu de X, avec leur issue chd"""
+        dist, idx = self.kneighbors(X.iloc[:1], k=k)
+        neighbors = self.cohort_.iloc[idx[0]].copy()
+        for column in neighbors.columns:
+            if column in SCHEMA and SCHEMA[column].dtype.startswith('float'):
+                # Affichage à la précision du schéma (et non au bruit du stockage float32)
+                neighbors[column] = neighbors[column].astype('float64').round(SCHEMA[column].scale)
+        neighbors.insert(0, 'distance', dist[0])
+        neighbors['chd'] = self.outcomes_[idx[0]]
+        return neighbors.reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de l'index de patients similaires")
+    parser.add_argument('--index', default='Neighbors.pkl', help="Index produit par main.py")
+    parser.add_argument('--data', default='CHD.csv')
+    parser.add_argument('--rows', type=int, default=1000000, help="Taille de la cohorte simulée")
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('-k', type=int, default=5)
+    args = parser.parse_args()
+
+    preprocessing = joblib.load(args.index).preprocessing
+    df, _ = read_chd(args.data)
+    cohort = df.sample(args.rows, replace=True, random_state=123).reset_index(drop=True)
+    rng = np.random.RandomState(123)
+    for column in ['sbp', 'ldl', 'adiposity', 'obesity', 'age']:
+        # Bruit léger pour éviter les doublons exacts de la cohorte rééchantillonnée
+        cohort[column] = cohort[column] + rng.normal(0, 0.01 * cohort[column].std(), len(cohort))
+
+    start = time.perf_counter()
+    index = PatientIndex(preprocessing).fit(cohort.drop('chd', axis=1), cohort['chd'])
+    build = time.perf_counter() - start
+
+    queries = df.drop('chd', axis=1).sample(args.queries, replace=True, random_state=1)
+    rows = [queries.iloc[i:i + 1] for i in range(len(queries))]
+    encode_times, search_times = [], []
+    for row in rows:
+        start = time.perf_counter()
+        Z = index.encoder_.transform(row)
+        encoded = time.perf_counter()
+        index.tree_.query(Z, k=args.k)
+        encode_times.append(encoded - start)
+        search_times.append(time.perf_counter() - encoded)
+    encode_times = np.array(encode_times) * 1000
+    search_times = np.array(search_times) * 1000
+    total_times = encode_times + search_times
+
+    print(f"Cohorte: {args.rows} patients, construction: {build:.2f} s")
+    for label, timings in (('Prétraitement', encode_times), ('Recherche KD-tree', search_times),
+                           ('Total', total_times)):
+        print(f"{label} (k={args.k}): médiane {np.median(timings):.3f} ms, "
+              f"p99 {np.percentile(timings, 99):.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
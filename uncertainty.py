@@ -0,0 +1,105 @@
+"""Intervalles d'incertitude par ensemble bootstrap vectorisé.
+
+Les membres logistiques (ACP + régression logistique) sont ramenés à une
+seule application linéaire dans l'espace prétraité et empilés dans une
+matrice de coefficients: évaluer un patient contre les N membres revient à
+un unique produit matriciel.
+"""
+import numpy as np
+from sklearn.base import clone
+from sklearn.pipeline import Pipeline
+from inference import compile_pipeline
+from utils import CalibratedModel
+
+
+class BootstrapEnsemble:
+    """Ensemble bootstrap du pipeline retenu, évalué en une passe vectorisée.
+
+    Pour un pipeline logistique, chaque membre réajuste l'ACP et le
+    classifieur sur un échantillon bootstrap des données prétraitées (le
+    prétraitement reste celui du modèle final). Pour le pipeline KNN, chaque
+    membre est une pondération de Poisson des points de l'index, appliquée
+    à une seule recherche de voisins.
+    """
+
+    def __init__(self, n_members=200, random_state=123, chunk_size=256):
+        self.n_members = n_members
+        self.random_state = random_state
+        self.chunk_size = chunk_size
+
+    def fit(self, model, X, y):
+        self.calibration_ = None
+        if isinstance(model, CalibratedModel):
+            self.calibration_ = (model.thresholds, model.values)
+            model = model.pipeline
+
+        steps = dict(model.steps)
+        prefix = [(name, step) for name, step in model.steps
+                  if name in ('cleaner', 'preprocessor')]
+        self.encoder_ = compile_pipeline(Pipeline(prefix), dtype=np.float64)
+        rng = np.random.RandomState(self.random_state)
+        classifier = steps['classifier']
+
+        if hasattr(classifier, 'coef_'):
+            Z = self.encoder_.transform(X)
+            y = np.asarray(y)
+            pca = steps.get('pca')
+            coefs, intercepts = [], []
+            for _ in range(self.n_members):
+                sample = rng.randint(0, len(Z), len(Z))
+                Zb, yb = Z[sample], y[sample]
+                if pca is not None:
+                    member_pca = clone(pca).fit(Zb)
+                    member = clone(classifier).fit(member_pca.transform(Zb), yb)
+                    # logit = coef . (z - mean) P^T + b  =  (coef P) . z + (b - coef P . mean)
+                    w = member.coef_[0] @ member_pca.components_
+                    b = member.intercept_[0] - w @ member_pca.mean_
+                else:
+                    member = clone(classifier).fit(Zb, yb)
+                    w, b = member.coef_[0], member.intercept_[0]
+                coefs.append(w)
+                intercepts.append(b)
+            self.coef_ = np.vstack(coefs)
+            self.intercept_ = np.array(intercepts)
+            self.knn_ = None
+        else:
+            self.pca_ = steps.get('pca')
+            self.knn_ = classifier
+            n_fit = classifier.n_samples_fit_
+            self.weights_ = rng.poisson(1.0, size=(self.n_members, n_fit)).astype(np.uint8)
+            self.positive_ = (classifier._y == 1).astype(np.float32)
+        return self
+
+    def member_proba(self, X):
+        """Probabilité de la classe 1 pour chaque membre: matrice (n_patients, n_membres)"""
+        Z = self.encoder_.transform(X)
+        if self.knn_ is None:
+            logits = Z @ self.coef_.T + self.intercept_
+            return 1 / (1 + np.exp(-logits))
+        if self.pca_ is not None:
+            Z = self.pca_.transform(Z)
+        return np.vstack([
+            self._knn_member_proba(Z[i:i + self.chunk_size])
+            for i in range(0, len(Z), self.chunk_size)
+        ])
+
+    def _knn_member_proba(self, Z):
+        k = self.knn_.n_neighbors
+        # Réserve de voisins suffisante pour que chaque membre en retrouve k pondérés
+        n_query = min(4 * k, self.knn_.n_samples_fit_)
+        _, idx = self.knn_.kneighbors(Z, n_neighbors=n_query)
+        w = self.weights_[:, idx].astype(np.float32)              # (membres, patients, voisins)
+        before = np.cumsum(w, axis=2) - w
+        used = np.clip(k - before, 0, w)                             # poids pris jusqu'à k voisins
+        votes = (used * self.positive_[idx]).sum(axis=2)
+        total = used.sum(axis=2)
+        return (votes / np.maximum(total, 1)).T
+
+    def predict_interval(self, X, alpha=0.1):
+        """Bornes (basse, haute) de l'intervalle à 1 - alpha pour chaque patient"""
+        proba = self.member_proba(X)
+        low, high = np.quantile(proba, [alpha / 2, 1 - alpha / 2], axis=1)
+        if self.calibration_ is not None:
+            # Calibration monotone: les quantiles se transposent directement
+            low, high = np.interp(low, *self.calibration_), np.interp(high, *self.calibration_)
+        return low, high
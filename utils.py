@@ -1,4 +1,10 @@
-from sklearn.base import BaseEstimator, TransformerMixin
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+from sklearn.base import BaseEstimator, TransformerMixin, ClassifierMixin
+from sklearn.isotonic import IsotonicRegression
+from sklearn.linear_model import LogisticRegression
 
 class TextCleaner(BaseEstimator, TransformerMixin):
     """Transformer personnalisé pour uniformiser les valeurs de famhist"""
@@ -9,4 +15,133 @@ class TextCleaner(BaseEstimator, TransformerMixin):
         X_copy = X.copy()
         if 'famhist' in X_copy.columns:
             X_copy['famhist'] = X_copy['famhist'].str.strip().str.capitalize()
-        return X_copy
\ No newline at end of file
+        return X_copy
+
+
+def fit_calibration(proba, y, method='isotonic', n_points=101):
+    """Table de calibration monotone (seuils, valeurs) à partir de probabilités hors échantillon"""
+    proba = np.asarray(proba, dtype=float)
+    y = np.asarray(y)
+    if method == 'isotonic':
+        iso = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds='clip').fit(proba, y)
+        # Un point au milieu de chaque palier: interpolation strictement croissante, sans
+        # plateaux qui écraseraient les écarts de probabilité (intervalles bootstrap)
+        levels, inverse = np.unique(iso.y_thresholds_, return_inverse=True)
+        centers = np.bincount(inverse, weights=iso.X_thresholds_) / np.bincount(inverse)
+        return centers, levels
+    if method == 'platt':
+        platt = LogisticRegression().fit(proba.reshape(-1, 1), y)
+        grid = np.linspace(0.0, 1.0, n_points)
+        return grid, platt.predict_proba(grid.reshape(-1, 1))[:, 1]
+    raise ValueError(f"Méthode de calibration inconnue: {method}")
+
+
+class CalibratedModel(BaseEstimator, ClassifierMixin):
+    """Pipeline entraîné suivi d'une table de calibration appliquée par interpolation"""
+    def __init__(self, pipeline, thresholds, values):
+        self.pipeline = pipeline
+        self.thresholds = thresholds
+        self.values = values
+
+    @property
+    def classes_(self):
+        return self.pipeline.classes_
+
+    def fit(self, X, y):
+        # Seul le pipeline est réentraîné; la table de calibration est conservée
+        self.pipeline.fit(X, y)
+        return self
+
+    def calibrate(self, p1):
+        return np.interp(p1, self.thresholds, self.values)
+
+    def predict_proba(self, X):
+        p1 = self.calibrate(self.pipeline.predict_proba(X)[:, 1])
+        return np.column_stack([1 - p1, p1])
+
+    def predict(self, X):
+        return self.classes_[(self.predict_proba(X)[:, 1] >= 0.5).astype(int)]
+
+
+# Décompositions déjà calculées, indexées par le contenu de la matrice
+_DECOMPOSITION_CACHE = OrderedDict()
+_DECOMPOSITION_CACHE_SIZE = 8
+
+
+def _decompose(X, large_n_samples, chunk_size=65536):
+    """Décomposition complète (moyenne, axes, valeurs singulières) calculée une seule fois par matrice"""
+    key = (X.shape, hashlib.sha1(np.ascontiguousarray(X).view(np.uint8)).hexdigest())
+    if key in _DECOMPOSITION_CACHE:
+        _DECOMPOSITION_CACHE.move_to_end(key)
+        return _DECOMPOSITION_CACHE[key]
+
+    mean = X.mean(axis=0)
+    if X.shape[0] < large_n_samples:
+        _, singular_values, Vt = np.linalg.svd(X - mean, full_matrices=False)
+        solver = 'full'
+    else:
+        # Beaucoup de lignes: matrice de covariance accumulée par blocs puis diagonalisée
+        cov = np.zeros((X.shape[1], X.shape[1]))
+        for start in range(0, X.shape[0], chunk_size):
+            block = X[start:start + chunk_size] - mean
+            cov += block.T @ block
+        eigenvalues, eigenvectors = np.linalg.eigh(cov)
+        order = np.argsort(eigenvalues)[::-1]
+        singular_values = np.sqrt(np.clip(eigenvalues[order], 0, None))
+        Vt = eigenvectors[:, order].T
+        solver = 'covariance'
+
+    # Même convention de signe que sklearn: plus grande composante de chaque axe positive
+    signs = np.sign(Vt[np.arange(Vt.shape[0]), np.argmax(np.abs(Vt), axis=1)])
+    Vt *= signs[:, None]
+
+    result = (mean, Vt, singular_values, solver)
+    _DECOMPOSITION_CACHE[key] = result
+    if len(_DECOMPOSITION_CACHE) > _DECOMPOSITION_CACHE_SIZE:
+        _DECOMPOSITION_CACHE.popitem(last=False)
+    return result
+
+
+class SharedPCA(BaseEstimator, TransformerMixin):
+    """ACP dont la décomposition complète est partagée entre toutes les troncatures.
+
+    Les variantes (95% de variance, 90%, k fixe) ajustées sur la même matrice
+    réutilisent la même SVD; seule la sélection des composantes change.
+    Au-delà de ``large_n_samples`` lignes, la décomposition passe par la
+    covariance accumulée par blocs.
+    """
+    def __init__(self, n_components=None, large_n_samples=100000):
+        self.n_components = n_components
+        self.large_n_samples = large_n_samples
+
+    def fit(self, X, y=None):
+        X = np.asarray(X, dtype=float)
+        n_samples = X.shape[0]
+        mean, Vt, singular_values, solver = _decompose(X, self.large_n_samples)
+
+        explained_variance = singular_values ** 2 / (n_samples - 1)
+        total_variance = explained_variance.sum()
+        ratio = explained_variance / total_variance
+
+        if self.n_components is None:
+            k = len(ratio)
+        elif 0 < self.n_components < 1:
+            k = int(np.searchsorted(np.cumsum(ratio), self.n_components, side='right') + 1)
+        else:
+            k = int(self.n_components)
+        k = min(k, len(ratio))
+
+        # Copies: le cache est partagé entre toutes les ACP ajustées sur la même matrice
+        self.mean_ = mean.copy()
+        self.components_ = Vt[:k].copy()
+        self.singular_values_ = singular_values[:k].copy()
+        self.explained_variance_ = explained_variance[:k]
+        self.explained_variance_ratio_ = ratio[:k]
+        self.full_explained_variance_ratio_ = ratio
+        self.n_components_ = k
+        self.n_features_in_ = X.shape[1]
+        self.svd_solver_ = solver
+        return self
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=float) - self.mean_) @ self.components_.T